@@ -1,8 +1,15 @@
 """Stream class for tap-turso."""
 
-from typing import Any, Dict, Iterable, Optional, List
-from datetime import datetime
-import libsql
+from typing import Any, Callable, Dict, Iterable, Optional, List, Tuple
+from datetime import datetime, timezone
+from binascii import b2a_base64
+from functools import lru_cache
+import hashlib
+from itertools import chain, repeat
+import json
+import logging
+import re
+import sys
 import tempfile
 import os
 import time
@@ -10,6 +17,129 @@ import time
 from singer_sdk.streams import Stream
 from singer_sdk import typing as th
 
+# Default location for the persisted schema cache (see `_schema_cache_path`)
+DEFAULT_SCHEMA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tap-turso")
+
+# SQLite type affinity rules, in priority order (group number = priority).
+# See: https://www.sqlite.org/datatype3.html
+# The lookahead keeps matches zero-width so overlapping names are all found.
+_TYPE_PATTERN = re.compile(
+    r"(?=(INT)|(CHAR|CLOB|TEXT)|(REAL|FLOA|DOUB|NUMERIC|DECIMAL)|(BLOB)|(BOOL))"
+)
+_AFFINITY_NAMES = (None, "INTEGER", "TEXT", "REAL", "BLOB", "BOOLEAN")
+_DATETIME_PATTERN = re.compile(r"DATE|TIME")
+
+# Affinity (as returned by `_affinity_of`) -> Singer type
+_AFFINITY = {
+    "INTEGER": th.IntegerType,
+    "TEXT": th.StringType,
+    "DATETIME": th.DateTimeType,  # TEXT with a date/time name
+    "REAL": th.NumberType,
+    "BLOB": th.StringType,  # Encoded as base64 string
+    "BOOLEAN": th.BooleanType,  # SQLite stores as INTEGER 0/1
+}
+
+# Bump when the layout of schema cache entries changes so old files are ignored
+SCHEMA_CACHE_FORMAT = 4
+
+# Tables with fewer rows than this are fetched with a single call (0 = disabled)
+DEFAULT_IN_MEMORY_THRESHOLD = 0
+
+# Maximum number of cached table schemas kept in the cache directory
+SCHEMA_CACHE_MAX_ENTRIES = 256
+
+
+def _qid(name: str) -> str:
+    """Quote an SQL identifier, escaping embedded double quotes.
+
+    Args:
+        name: Table or column name
+
+    Returns:
+        Double-quoted identifier safe to embed in SQL text
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _affinity_of(sql_type: str) -> Optional[str]:
+    """Return the affinity name used to map a declared SQLite type.
+
+    Args:
+        sql_type: Upper-cased SQLite column type
+
+    Returns:
+        Key of `_AFFINITY`, or None for unknown types
+    """
+    matches = {match.lastindex for match in _TYPE_PATTERN.finditer(sql_type)}
+    if not matches:
+        return None
+
+    affinity = _AFFINITY_NAMES[min(matches)]
+    if affinity == "TEXT" and _DATETIME_PATTERN.search(sql_type):
+        return "DATETIME"
+    return affinity
+
+
+@lru_cache(maxsize=128)
+def _map_sql_type(sql_type: str) -> th.JSONTypeHelper:
+    """Map SQLite data type to Singer type.
+
+    Args:
+        sql_type: SQLite column type (e.g., 'INTEGER', 'TEXT', 'REAL')
+
+    Returns:
+        Singer type helper
+    """
+    # Default to string for unknown types
+    return _AFFINITY.get(_affinity_of(sql_type.upper()), th.StringType)
+
+
+def _encode_blob(value: Any) -> Any:
+    """Encode bytes (BLOB) as base64, leaving other values untouched."""
+    if isinstance(value, bytes):
+        return b2a_base64(value, newline=False).decode("ascii")
+    return value
+
+
+def _rows_to_dicts(
+    rows: List[tuple],
+    names: Tuple[str, ...],
+    converters: List[Optional[Callable[[Any], Any]]],
+) -> List[dict]:
+    """Convert a batch of database rows to record dictionaries.
+
+    Conversion runs column-wise over the whole batch: only columns with a
+    converter are transformed, all others are passed through as-is. SQLite
+    types are dynamic, so a column of any declared type may still hold a
+    BLOB: the batch is probed once for bytes, and columns holding any are
+    base64 encoded for this batch only.
+
+    Args:
+        rows: Database rows as tuples
+        names: Record keys, one per row value
+        converters: Per-column value converter, or None for pass-through columns
+
+    Returns:
+        List of record dictionaries
+    """
+    # Fast path: nothing to convert, build records straight from the rows
+    if not any(converters) and not any(
+        type(value) is bytes for value in chain.from_iterable(rows)
+    ):
+        return list(map(dict, map(zip, repeat(names), rows)))
+
+    columns = list(zip(*rows))
+
+    for i, convert in enumerate(converters):
+        column = columns[i]
+        if convert is None:
+            if not any(type(value) is bytes for value in column):
+                continue
+            convert = _encode_blob
+        columns[i] = [None if value is None else convert(value) for value in column]
+
+    return list(map(dict, map(zip, repeat(names), zip(*columns))))
+
 
 class TursoStream(Stream):
     """Stream for Turso SQLite table."""
@@ -38,9 +168,17 @@ class TursoStream(Stream):
         self._replication_method = replication_method
         self._replication_key_config = replication_key  # Store configured replication key
         self._primary_keys_config = primary_keys  # Store configured primary keys separately
-        self._connection = None
         self._schema_cache = None
-        self._temp_db_path = None  # Track temp file for cleanup
+        self._primary_keys_detected = None  # Populated by _discover_schema
+        self._column_names = None  # Populated by _discover_schema
+        # Extraction timestamp shared by every record of this run
+        self._extracted_at = datetime.now(timezone.utc).isoformat()
+        self._column_converters = []  # Per-column value converters
+        # Read once here rather than on every get_records call
+        self._batch_size = int(tap.config.get("batch_size", 1000))
+        self._in_memory_threshold = int(
+            tap.config.get("in_memory_threshold", DEFAULT_IN_MEMORY_THRESHOLD)
+        )
 
         super().__init__(tap=tap, name=name, schema=None, **kwargs)
 
@@ -143,181 +281,192 @@ class TursoStream(Stream):
         self._schema_cache = self._discover_schema()
         return self._schema_cache
 
-    def _connect_with_retry(self, connect_func, max_retries: int = 3, initial_delay: float = 1.0):
-        """Execute connection function with exponential backoff retry logic.
-
-        Args:
-            connect_func: Function that returns a connection object
-            max_retries: Maximum number of retry attempts
-            initial_delay: Initial delay in seconds before first retry
+    def _get_connection(self):
+        """Get the database connection shared by all streams of the tap.
 
         Returns:
-            Connection object from connect_func
+            libsql connection object
+        """
+        return self._tap.get_connection()
+
+    def _schema_cache_path(self) -> str:
+        """Return the path of the persisted schema cache file for this table.
 
-        Raises:
-            Exception: If connection fails after all retries
+        The file name combines a hash of the database location with the table
+        name, so different databases never share cache entries.
+
+        Returns:
+            Absolute path to the JSON cache file
         """
-        last_error = None
-        for attempt in range(max_retries):
-            try:
-                start_time = time.time()
-                self.logger.info(f"Connecting to database (attempt {attempt + 1}/{max_retries})...")
-                self.logger.info("This may take a while for large databases - syncing from remote...")
-                connection = connect_func()
-                elapsed = time.time() - start_time
-                self.logger.info(f"Connection established successfully in {elapsed:.2f} seconds")
-                return connection
-            except Exception as error:
-                elapsed = time.time() - start_time
-                last_error = error
-                if attempt < max_retries - 1:
-                    delay = initial_delay * (2 ** attempt)  # Exponential backoff
-                    self.logger.warning(
-                        f"Connection attempt {attempt + 1} failed after {elapsed:.2f}s: {error}. "
-                        f"Retrying in {delay} seconds..."
-                    )
-                    time.sleep(delay)
-                else:
-                    # Last attempt failed
-                    self.logger.error(f"Connection failed after {max_retries} attempts and {elapsed:.2f}s: {error}")
-
-        raise last_error
-
-    def _sync_with_retry(self, connection, max_retries: int = 3, initial_delay: float = 1.0):
-        """Sync database with remote using exponential backoff retry logic.
+        config = self.config
+        database_id = (
+            config.get("sync_url")
+            or config.get("database_url")
+            or os.path.abspath(config.get("local_path", "local.db"))
+        )
+        db_hash = hashlib.sha256(database_id.encode("utf-8")).hexdigest()[:16]
+        # Keep the table name readable but safe to use as a file name
+        safe_table = re.sub(r"[^A-Za-z0-9_.-]", "_", self.table_name)
+        cache_dir = config.get("schema_cache_dir") or DEFAULT_SCHEMA_CACHE_DIR
+        return os.path.join(cache_dir, f"schema-{db_hash}-{safe_table}.json")
+
+    def _get_schema_fingerprint(self, conn) -> Tuple[int, Optional[str]]:
+        """Return the database schema version and a hash of this table's definition.
+
+        SQLite increments `PRAGMA schema_version` on every schema change, which
+        makes it a cheap cache key for discovered schemas. A different database
+        file at the same location can report the same version (fresh files
+        commonly do), so the hash of the table's CREATE statement is part of
+        the key too. Both come back from a single query.
 
         Args:
-            connection: libsql connection object
-            max_retries: Maximum number of retry attempts
-            initial_delay: Initial delay in seconds before first retry
+            conn: libsql connection object
 
-        Raises:
-            Exception: If sync fails after all retries
+        Returns:
+            Tuple of (schema version, table definition hash or None if not found)
         """
-        for attempt in range(max_retries):
-            try:
-                start_time = time.time()
-                self.logger.info(f"Syncing with remote database (attempt {attempt + 1}/{max_retries})...")
-                self.logger.info("Downloading database changes from Turso...")
-                connection.sync()
-                elapsed = time.time() - start_time
-                self.logger.info(f"Sync completed successfully in {elapsed:.2f} seconds")
-                return
-            except Exception as sync_error:
-                elapsed = time.time() - start_time
-                if attempt < max_retries - 1:
-                    delay = initial_delay * (2 ** attempt)  # Exponential backoff
-                    self.logger.warning(
-                        f"Sync attempt {attempt + 1} failed after {elapsed:.2f}s: {sync_error}. "
-                        f"Retrying in {delay} seconds..."
-                    )
-                    time.sleep(delay)
-                else:
-                    # Last attempt failed
-                    self.logger.error(f"Sync failed after {max_retries} attempts and {elapsed:.2f}s: {sync_error}")
-                    raise
+        schema_version, table_sql = conn.execute(
+            "SELECT (SELECT schema_version FROM pragma_schema_version), "
+            "(SELECT sql FROM sqlite_master WHERE type IN ('table', 'view') "
+            "AND name = ? COLLATE NOCASE)",
+            (self.table_name,),
+        ).fetchone()
+        if table_sql is None:
+            return schema_version, None
+        return schema_version, hashlib.sha256(table_sql.encode("utf-8")).hexdigest()
+
+    def _read_schema_cache(
+        self, schema_version: int, table_hash: Optional[str]
+    ) -> Optional[dict]:
+        """Read the persisted schema cache entry for this table.
 
-    def _get_connection(self):
-        """Get or create database connection.
+        Args:
+            schema_version: Current database schema version
+            table_hash: Hash of the table's current CREATE statement
 
         Returns:
-            libsql connection object
+            Cache entry dictionary, or None if missing, unreadable or stale
         """
-        # Check if stream already has a connection
-        if self._connection is not None:
-            return self._connection
+        if table_hash is None:
+            return None
 
-        # Check if tap has a shared connection we can reuse
-        if hasattr(self._tap, '_shared_connection') and self._tap._shared_connection is not None:
-            self.logger.info("Reusing shared connection from tap")
-            self._connection = self._tap._shared_connection
-            return self._connection
+        cache_path = self._schema_cache_path()
+        try:
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(entry, dict)
+            or entry.get("format") != SCHEMA_CACHE_FORMAT
+            or entry.get("schema_version") != schema_version
+            or entry.get("table_hash") != table_hash
+        ):
+            return None
+
+        # Refresh the modification time so pruning evicts least recently used
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
 
-        config = self.config
+        self.logger.info(
+            f"Using cached schema for table '{self.table_name}' "
+            f"(schema_version={schema_version})"
+        )
+        return entry
+
+    def _write_schema_cache(self, entry: dict) -> None:
+        """Persist a schema cache entry for this table.
 
+        The file is written to a temporary file first and then renamed, so
+        concurrent runs never observe a partially written cache.
+
+        Args:
+            entry: Cache entry dictionary (must include 'schema_version' and 'table_hash')
+        """
+        cache_path = self._schema_cache_path()
         try:
-            # Remote connection with embedded replica
-            if config.get("sync_url"):
-                self.logger.info(
-                    f"Connecting to Turso with embedded replica: {config.get('local_path', 'local.db')}"
-                )
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(cache_path), prefix=".schema-", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                    json.dump(entry, tmp_file)
+                os.replace(tmp_path, cache_path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            self.logger.warning(f"Could not write schema cache {cache_path}: {e}")
+            return
 
-                # Use retry logic for connection (which includes initial sync)
-                def connect_embedded_replica():
-                    return libsql.connect(
-                        database=config.get("local_path", "local.db"),
-                        sync_url=config["sync_url"],
-                        auth_token=config.get("auth_token"),
-                    )
-
-                try:
-                    self._connection = self._connect_with_retry(connect_embedded_replica)
-                except Exception as conn_error:
-                    self.logger.warning(f"Failed to connect with sync: {conn_error}. Trying local-only mode.")
-                    # Fallback: try connecting without sync
-                    self._connection = libsql.connect(database=config.get("local_path", "local.db"))
-
-            # Remote connection only
-            elif config.get("database_url"):
-                self.logger.info(f"Connecting to remote Turso database")
-                # For remote-only, we use embedded replica with a temp file
-                # Note: :memory: doesn't work well with sync()
-                temp_dir = tempfile.gettempdir()
-                self._temp_db_path = os.path.join(temp_dir, f"tap-turso-{os.getpid()}.db")
-
-                self.logger.info(f"Using temporary database file: {self._temp_db_path}")
-
-                # Use retry logic for connection (which includes initial sync)
-                def connect_remote():
-                    return libsql.connect(
-                        database=self._temp_db_path,
-                        sync_url=config["database_url"],
-                        auth_token=config["auth_token"],
-                    )
-
-                self._connection = self._connect_with_retry(connect_remote)
-
-            # Local database only
-            else:
-                self.logger.info(
-                    f"Connecting to local database: {config['local_path']}"
-                )
-                self._connection = libsql.connect(database=config["local_path"])
+        self._prune_schema_cache(os.path.dirname(cache_path))
 
-        except Exception as e:
-            self.logger.error(f"Failed to connect to database: {e}")
-            raise RuntimeError(f"Database connection failed: {e}")
+    def _prune_schema_cache(self, cache_dir: str) -> None:
+        """Remove least recently used entries beyond SCHEMA_CACHE_MAX_ENTRIES.
+
+        Args:
+            cache_dir: Directory holding the schema cache files
+        """
+        try:
+            paths = [
+                entry.path
+                for entry in os.scandir(cache_dir)
+                if entry.name.startswith("schema-") and entry.name.endswith(".json")
+            ]
+            if len(paths) <= SCHEMA_CACHE_MAX_ENTRIES:
+                return
+            paths.sort(key=os.path.getmtime, reverse=True)
+            for path in paths[SCHEMA_CACHE_MAX_ENTRIES:]:
+                os.remove(path)
+        except OSError as e:
+            self.logger.debug(f"Could not prune schema cache {cache_dir}: {e}")
+
+    def _get_table_info(self, schema_version: int) -> List[tuple]:
+        """Return PRAGMA table_xinfo rows for this table's readable columns.
 
-        # Store connection in tap for reuse by other streams
-        if hasattr(self._tap, '_shared_connection'):
-            self.logger.info("Storing connection in tap for reuse by other streams")
-            self._tap._shared_connection = self._connection
+        Results are cached on the tap per (table, schema version), so streams
+        reading the same table share one lookup per run.
 
-        return self._connection
+        Args:
+            schema_version: Current database schema version
+
+        Returns:
+            Rows of (cid, name, type, notnull, dflt_value, pk)
+        """
+        cache = self._tap._table_info_cache
+        cache_key = (self.table_name, schema_version)
+        if cache_key not in cache:
+            # The pragma_table_xinfo() table-valued function accepts the table
+            # name as a bind parameter, so no quoting/escaping is needed. Unlike
+            # table_info it also lists generated columns (hidden = 2 or 3);
+            # hidden virtual table columns (hidden = 1) are left out
+            cache[cache_key] = self._get_connection().execute(
+                "SELECT cid, name, type, \"notnull\", dflt_value, pk "
+                "FROM pragma_table_xinfo(?) WHERE hidden != 1",
+                (self.table_name,),
+            ).fetchall()
+        return cache[cache_key]
 
     def _detect_primary_keys(self) -> Optional[List[str]]:
         """Detect primary key columns from table schema.
 
+        Primary keys are collected during schema discovery, so this only
+        forces discovery (if not done yet) instead of querying the table again.
+
         Returns:
             List of primary key column names, or None if not found
         """
-        conn = self._get_connection()
-
-        # Query SQLite table info for primary key
-        # Use double quotes to handle reserved keywords and special characters
-        result = conn.execute(f'PRAGMA table_info("{self.table_name}")').fetchall()
+        _ = self.schema
 
-        primary_keys = []
-        for row in result:
-            # Row format: (cid, name, type, notnull, dflt_value, pk)
-            if row[5] > 0:  # pk column is index 5
-                primary_keys.append(row[1])  # name is index 1
-
-        if primary_keys:
+        if self._primary_keys_detected:
             self.logger.info(
-                f"Detected primary keys for {self.table_name}: {primary_keys}"
+                f"Detected primary keys for {self.table_name}: {self._primary_keys_detected}"
             )
-            return primary_keys
+            return self._primary_keys_detected
 
         return None
 
@@ -327,18 +476,28 @@ class TursoStream(Stream):
         Returns:
             Singer schema dictionary
         """
-        self.logger.info(f"Inspecting schema for table '{self.table_name}'...")
         conn = self._get_connection()
 
+        # Skip discovery entirely when the persisted schema is still current
+        schema_version, table_hash = self._get_schema_fingerprint(conn)
+        cached = self._read_schema_cache(schema_version, table_hash)
+        if cached is not None:
+            self._primary_keys_detected = cached["primary_keys"]
+            self._set_column_metadata(cached["columns"])
+            return cached["schema"]
+
+        self.logger.info(f"Inspecting schema for table '{self.table_name}'...")
+
         # Get column information
-        # Use double quotes to handle reserved keywords and special characters
-        result = conn.execute(f'PRAGMA table_info("{self.table_name}")').fetchall()
+        result = self._get_table_info(schema_version)
 
         if not result:
             raise ValueError(f"Table '{self.table_name}' not found in database")
 
         self.logger.info(f"Found {len(result)} columns in table '{self.table_name}'")
         property_list = []
+        primary_keys = []
+        columns = []
 
         for row in result:
             # Row format: (cid, name, type, notnull, dflt_value, pk)
@@ -346,6 +505,9 @@ class TursoStream(Stream):
             col_type = row[2].upper()
             is_nullable = row[3] == 0  # notnull: 0 = nullable, 1 = not null
             is_pk = row[5] > 0
+            if is_pk:
+                primary_keys.append(col_name)
+            columns.append([col_name, col_type])
 
             # Map SQLite type to Singer type
             singer_type = self._map_sql_type_to_singer(col_type)
@@ -369,51 +531,69 @@ class TursoStream(Stream):
             f"Discovered {len(properties)} columns for table {self.table_name}"
         )
 
+        self._primary_keys_detected = primary_keys
+        self._set_column_metadata(columns)
+        self._write_schema_cache(
+            {
+                "format": SCHEMA_CACHE_FORMAT,
+                "schema_version": schema_version,
+                "table_hash": table_hash,
+                "schema": schema,
+                "primary_keys": primary_keys,
+                "columns": columns,
+            }
+        )
+
         return schema
 
-    def _map_sql_type_to_singer(self, sql_type: str) -> th.JSONTypeHelper:
-        """Map SQLite data type to Singer type.
+    def _set_column_metadata(self, columns: List[List[str]]) -> None:
+        """Precompute per-column metadata used when converting rows.
 
-        Args:
-            sql_type: SQLite column type (e.g., 'INTEGER', 'TEXT', 'REAL')
+        Only columns whose declared type can hold BLOB values need per-value
+        conversion; all other columns are copied as-is.
 
-        Returns:
-            Singer type helper
+        Args:
+            columns: List of [column_name, declared_sql_type] pairs in table order
         """
-        # SQLite type affinity rules
-        # See: https://www.sqlite.org/datatype3.html
+        # Interned names let every record dict reuse the same key objects
+        self._column_names = tuple(sys.intern(name) for name, _ in columns)
+        self._column_converters = [self._column_converter(sql_type) for _, sql_type in columns]
 
-        sql_type = sql_type.upper()
+    def _column_converter(self, sql_type: str) -> Optional[Callable[[Any], Any]]:
+        """Return the value converter for a column, or None if values pass through.
 
-        # INTEGER types
-        if "INT" in sql_type:
-            return th.IntegerType
+        Stray BLOB values in columns of other declared types are caught per
+        batch by `_rows_to_dicts`.
 
-        # TEXT types
-        if any(t in sql_type for t in ["CHAR", "CLOB", "TEXT"]):
-            # Check for datetime patterns
-            if any(t in sql_type for t in ["DATE", "TIME"]):
-                return th.DateTimeType
-            return th.StringType
+        Args:
+            sql_type: Declared SQLite column type (upper case)
 
-        # REAL/NUMERIC types
-        if any(t in sql_type for t in ["REAL", "FLOA", "DOUB", "NUMERIC", "DECIMAL"]):
-            return th.NumberType
+        Returns:
+            Converter function, or None
+        """
+        # An empty declared type has BLOB affinity in SQLite
+        if "BLOB" in sql_type or not sql_type:
+            return _encode_blob
+        return None
 
-        # BLOB
-        if "BLOB" in sql_type:
-            return th.StringType  # Encode as base64 string
+    def _map_sql_type_to_singer(self, sql_type: str) -> th.JSONTypeHelper:
+        """Map SQLite data type to Singer type.
 
-        # Boolean (SQLite stores as INTEGER 0/1)
-        if "BOOL" in sql_type:
-            return th.BooleanType
+        Args:
+            sql_type: SQLite column type (e.g., 'INTEGER', 'TEXT', 'REAL')
 
-        # Default to string for unknown types
-        return th.StringType
+        Returns:
+            Singer type helper
+        """
+        return _map_sql_type(sql_type)
 
     def get_records(self, context: Optional[dict]) -> Iterable[dict]:
         """Retrieve records from the table.
 
+        `_sdc_extracted_at` is the time the sync run started (when the stream
+        was created), not the time each row was fetched, so all records of a
+        run share the same value.
+
         Args:
             context: Stream context (includes state)
 
@@ -421,82 +601,220 @@ class TursoStream(Stream):
             Record dictionaries
         """
         conn = self._get_connection()
-        batch_size = self.config.get("batch_size", 1000)
+        batch_size = self._batch_size
+        logger = self.logger
+
+        # Make sure column metadata used by _rows_to_dicts is available
+        _ = self.schema
 
         # Build query based on replication method
         if self._replication_method == "INCREMENTAL" and self.replication_key:
             # Incremental query with replication key filter
-            query = self._build_incremental_query(context)
+            if self.config.get("create_replication_key_index"):
+                self._ensure_replication_key_index()
+            query, params = self._build_incremental_query(context)
+
+            # Skip the full query (and cursor setup) when nothing changed
+            start_params = params[1:]
+            if start_params and not self._has_rows_after(conn, start_params[0]):
+                logger.info(
+                    "No new records in %s since %s, skipping query",
+                    self.table_name,
+                    start_params[0],
+                )
+                return
         else:
-            # Full table query - quote table name to handle reserved keywords
-            query = f'SELECT * FROM "{self.table_name}"'
+            # Full table query
+            query, params = self._select_query()
 
-        self.logger.info(f"Executing query: {query}")
+        logger.info("Executing query: %s", query)
         query_start_time = time.time()
 
         # Execute query and fetch in batches
-        self.logger.info(f"Running query on table '{self.table_name}'...")
-        cursor = conn.execute(query)
+        logger.info("Running query on table '%s'...", self.table_name)
+        cursor = conn.execute(query, params)
         query_exec_time = time.time() - query_start_time
-        self.logger.info(f"Query executed in {query_exec_time:.2f} seconds, now fetching results...")
+        logger.info(
+            "Query executed in %.2f seconds, now fetching results...", query_exec_time
+        )
 
-        # Get column names from cursor description
-        # Note: libsql cursor.description format is [(name, type_code), ...]
-        if hasattr(cursor, "description") and cursor.description:
-            column_names = [desc[0] for desc in cursor.description]
-        else:
-            # Fallback: get columns from PRAGMA - quote table name
-            col_info = conn.execute(f'PRAGMA table_info("{self.table_name}")').fetchall()
-            column_names = [row[1] for row in col_info]
+        # Column order matches PRAGMA table_xinfo, which discovery already
+        # read, so names come from there rather than cursor.description. The
+        # extraction timestamp arrives as the last column of every row
+        selected = self._selected_column_indexes()
+        record_keys = (*(self._column_names[i] for i in selected), "_sdc_extracted_at")
+        converters = [self._column_converters[i] for i in selected]
+
+        # Values are matched to keys by position: refuse to emit shifted records
+        if cursor.description is not None and len(cursor.description) != len(record_keys):
+            raise RuntimeError(
+                f"Query on table '{self.table_name}' returned {len(cursor.description)} "
+                f"columns but {len(record_keys)} were expected; the discovered "
+                "schema does not match the table"
+            )
 
-        self.logger.info(f"Fetching records in batches of {batch_size}...")
+        logger.info("Fetching records in batches of %d...", batch_size)
+
+        # libsql cursors are not iterable: fetchmany() pulls `arraysize` rows at
+        # a time. Each page is converted as a whole, then flattened into a
+        # single stream of records
+        cursor.arraysize = batch_size
+        pages = iter(cursor.fetchmany, [])
+
+        # Tables that fit under the threshold are read in one call and
+        # converted in a single column-wise pass
+        threshold = self._in_memory_threshold
+        if threshold > 0:
+            first_page = cursor.fetchmany(threshold)
+            if len(first_page) < threshold:
+                logger.info(
+                    "Read all %d rows of %s in memory", len(first_page), self.table_name
+                )
+                pages = [first_page] if first_page else []
+            else:
+                pages = chain([first_page], pages)
+        records = chain.from_iterable(
+            _rows_to_dicts(rows, record_keys, converters)
+            for rows in pages
+        )
+
+        # Without INFO logging there is nothing to time or count
+        if not logger.isEnabledFor(logging.INFO):
+            yield from records
+            return
 
-        # Fetch and yield records in batches
         record_count = 0
         batch_count = 0
         fetch_start_time = time.time()
+        batch_start = fetch_start_time
+
+        for record_count, record in enumerate(records, 1):
+            yield record
+
+            if record_count % batch_size == 0:
+                batch_count += 1
+                now = time.time()
+                batch_time = now - batch_start
+                elapsed = now - fetch_start_time
+                records_per_sec = record_count / elapsed if elapsed > 0 else 0
+
+                logger.info(
+                    "Batch %d: Fetched %d records "
+                    "(total: %d, rate: %.1f records/sec, batch time: %.2fs)",
+                    batch_count,
+                    batch_size,
+                    record_count,
+                    records_per_sec,
+                    batch_time,
+                )
 
-        while True:
-            batch_start = time.time()
-            rows = cursor.fetchmany(batch_size)
-            if not rows:
-                break
+                batch_start = now
 
-            batch_count += 1
-            for row in rows:
-                record = self._row_to_dict(row, column_names)
-                record["_sdc_extracted_at"] = datetime.utcnow().isoformat()
-                record_count += 1
-                yield record
+        total_time = time.time() - query_start_time
+        avg_rate = record_count / total_time if total_time > 0 else 0
+        logger.info(
+            "Completed fetching %d total records from %s "
+            "in %.2f seconds (avg: %.1f records/sec)",
+            record_count,
+            self.table_name,
+            total_time,
+            avg_rate,
+        )
 
-            batch_time = time.time() - batch_start
-            elapsed = time.time() - fetch_start_time
-            records_per_sec = record_count / elapsed if elapsed > 0 else 0
+    def _ensure_replication_key_index(self) -> None:
+        """Create an index on the replication key if it does not exist yet.
 
-            self.logger.info(
-                f"Batch {batch_count}: Fetched {len(rows)} records "
-                f"(total: {record_count}, rate: {records_per_sec:.1f} records/sec, "
-                f"batch time: {batch_time:.2f}s)"
+        With an index SQLite can walk rows in replication key order instead of
+        sorting the whole (filtered) table for every incremental run. The index
+        is created through the tap's shared connection, since worker read
+        connections are query-only.
+        """
+        # Tracked per tap, since each tap reads its own database
+        indexed = self._tap._indexed_replication_keys
+        index_key = (self.table_name, self.replication_key)
+        if index_key in indexed:
+            return
+
+        index_name = re.sub(
+            r"[^A-Za-z0-9_]", "_", f"ix_tap_turso_{self.table_name}_{self.replication_key}"
+        )
+        try:
+            with self._tap._connection_lock:
+                conn = self._tap._get_shared_connection()
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_qid(index_name)} "
+                    f"ON {_qid(self.table_name)}({_qid(self.replication_key)})"
+                )
+                conn.commit()
+            self.logger.info(f"Ensured index {index_name} on {self.table_name}")
+        except Exception as e:
+            self.logger.warning(
+                f"Could not create replication key index on {self.table_name}: {e}"
             )
+        indexed.add(index_key)
 
-        total_time = time.time() - query_start_time
-        avg_rate = record_count / total_time if total_time > 0 else 0
-        self.logger.info(
-            f"Completed fetching {record_count} total records from {self.table_name} "
-            f"in {total_time:.2f} seconds (avg: {avg_rate:.1f} records/sec)"
+    def _has_rows_after(self, conn, start_value: Any) -> bool:
+        """Check whether any row has a replication key greater than start_value.
+
+        Args:
+            conn: libsql connection object
+            start_value: Starting replication key value from state
+
+        Returns:
+            True if at least one newer row exists
+        """
+        query = (
+            f"SELECT 1 FROM {_qid(self.table_name)} "
+            f"WHERE {_qid(self.replication_key)} > ? LIMIT 1"
         )
+        return conn.execute(query, (start_value,)).fetchone() is not None
+
+    def _selected_column_indexes(self) -> List[int]:
+        """Return the indexes of discovered columns selected in the catalog.
+
+        Returns:
+            Column indexes in table order
+        """
+        mask = self.mask
+        return [
+            i
+            for i, name in enumerate(self._column_names)
+            if mask.get(("properties", name), True)
+        ]
+
+    def _select_query(self) -> Tuple[str, tuple]:
+        """Build the SELECT for this table, including `_sdc_extracted_at`.
+
+        Only columns selected in the catalog are read, always listed by name:
+        record keys are matched to row values by position, so the select list
+        must follow the discovered column order exactly. The extraction
+        timestamp is selected as a bound constant column, so it is part of
+        every row tuple and needs no per-record assignment.
+
+        Returns:
+            Tuple of (SQL query string, query parameters)
+        """
+        select_list = [_qid(self._column_names[i]) for i in self._selected_column_indexes()]
+        select_list.append("? AS _sdc_extracted_at")
+
+        # Quote table name to handle reserved keywords
+        query = f"SELECT {', '.join(select_list)} FROM {_qid(self.table_name)}"
+        return query, (self._extracted_at,)
 
-    def _build_incremental_query(self, context: Optional[dict]) -> str:
+    def _build_incremental_query(self, context: Optional[dict]) -> Tuple[str, tuple]:
         """Build SQL query for incremental replication.
 
+        The starting replication key value is passed as a bind parameter, so
+        the statement text stays the same across runs.
+
         Args:
             context: Stream context with state
 
         Returns:
-            SQL query string
+            Tuple of (SQL query string, query parameters)
         """
-        # Quote table name and column names to handle reserved keywords
-        query = f'SELECT * FROM "{self.table_name}"'
+        key = _qid(self.replication_key)
+        query, params = self._select_query()
 
         # Get starting replication key value from state
         start_value = self.get_starting_replication_key_value(context)
@@ -507,66 +825,10 @@ class TursoStream(Stream):
             self.logger.info(f"Incremental sync: no previous state, fetching all records")
 
         if start_value:
-            # Determine if replication key is numeric or string/datetime
-            # For safety, we use parameterized-style quoting
-            if isinstance(start_value, (int, float)):
-                query += f' WHERE "{self.replication_key}" > {start_value}'
-            else:
-                # String/datetime - quote the value
-                escaped_value = str(start_value).replace("'", "''")
-                query += f' WHERE "{self.replication_key}" > \'{escaped_value}\''
+            query += f" WHERE {key} > ?"
+            params += (start_value,)
 
         # Order by replication key for consistent state updates
-        query += f' ORDER BY "{self.replication_key}" ASC'
+        query += f" ORDER BY {key} ASC"
 
-        return query
-
-    def _row_to_dict(self, row: tuple, column_names: List[str]) -> dict:
-        """Convert a database row tuple to a dictionary.
-
-        Args:
-            row: Database row as tuple
-            column_names: List of column names
-
-        Returns:
-            Record dictionary
-        """
-        record = {}
-        for i, col_name in enumerate(column_names):
-            value = row[i]
-
-            # Handle None values
-            if value is None:
-                record[col_name] = None
-            # Handle datetime conversion if needed
-            elif isinstance(value, datetime):
-                record[col_name] = value.isoformat()
-            # Handle bytes (BLOB) - encode as base64
-            elif isinstance(value, bytes):
-                import base64
-
-                record[col_name] = base64.b64encode(value).decode("utf-8")
-            else:
-                record[col_name] = value
-
-        return record
-
-    def __del__(self):
-        """Close database connection when stream is destroyed."""
-        if self._connection:
-            try:
-                self._connection.close()
-            except Exception:
-                pass
-
-        # Clean up temporary database file if it was created
-        if self._temp_db_path and os.path.exists(self._temp_db_path):
-            try:
-                os.remove(self._temp_db_path)
-                # Also remove the associated -shm and -wal files if they exist
-                for ext in ["-shm", "-wal"]:
-                    temp_file = f"{self._temp_db_path}{ext}"
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-            except Exception:
-                pass
+        return query, params
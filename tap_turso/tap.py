@@ -1,18 +1,37 @@
 """Turso tap class."""
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
+import atexit
+import libsql
+import queue
+import random
+import threading
+import time
 
 from singer_sdk import Stream, Tap
 from singer_sdk import typing as th
 
 from tap_turso.streams import TursoStream
 
+# Default page cache size for tap connections, in KiB (64 MiB)
+DEFAULT_SQLITE_CACHE_KB = 65536
+
 
 class TapTurso(Tap):
     """Singer tap for Turso SQLite databases."""
 
     name = "tap-turso"
     _shared_connection = None  # Shared connection across all streams
+    _close_registered = False  # Whether close() is registered with atexit
+    # Stream methods that change the shared state dict (see _sync_all_concurrently)
+    _STATE_METHODS = (
+        "_write_replication_key_signpost",
+        "_write_starting_replication_value",
+        "_increment_stream_state",
+        "_finalize_state",
+        "finalize_state_progress_markers",
+    )
 
     config_jsonschema = th.PropertiesList(
         # Connection settings
@@ -86,8 +105,58 @@ class TapTurso(Tap):
             default=1000,
             description="Number of records to fetch per batch",
         ),
+        th.Property(
+            "in_memory_threshold",
+            th.IntegerType,
+            default=0,
+            description="Tables with fewer rows than this are fetched in a single call "
+            "and converted in one pass, reducing per-batch overhead. The first fetch "
+            "then reads up to this many rows at once regardless of batch_size. "
+            "Disabled (0) by default, so rows are always fetched in batches of batch_size.",
+        ),
+        th.Property(
+            "sqlite_cache_kb",
+            th.IntegerType,
+            default=DEFAULT_SQLITE_CACHE_KB,
+            description="SQLite page cache size in KiB applied to the connection "
+            "(PRAGMA cache_size). Larger values speed up scans of large tables.",
+        ),
+        th.Property(
+            "create_replication_key_index",
+            th.BooleanType,
+            default=False,
+            description="Create an index on the replication key of INCREMENTAL tables "
+            "(CREATE INDEX IF NOT EXISTS) so incremental queries avoid a full sort. "
+            "Requires write access to the database.",
+        ),
+        th.Property(
+            "concurrent_streams",
+            th.IntegerType,
+            default=1,
+            description="Number of streams to sync in parallel, each with its own "
+            "read connection. 1 (the default) syncs streams one after another.",
+        ),
+        th.Property(
+            "schema_cache_dir",
+            th.StringType,
+            required=False,
+            description="Directory used to persist discovered table schemas across runs. "
+            "Entries are invalidated automatically when the database schema changes. "
+            "Defaults to ~/.cache/tap-turso.",
+        ),
     ).to_dict()
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the tap and its worker connection pool."""
+        self._connection_lock = threading.RLock()
+        self._thread_local = threading.local()
+        self._read_pool = queue.SimpleQueue()  # Idle worker read connections
+        self._read_connections = []  # All read connections opened by workers
+        self._table_info_cache = {}  # (table, schema_version) -> table_info rows
+        self._indexed_replication_keys = set()  # (table, key) pairs with an ensured index
+
+        super().__init__(*args, **kwargs)
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams.
 
@@ -107,8 +176,36 @@ class TapTurso(Tap):
             )
             streams.append(stream)
 
+        if self.config.get("concurrent_streams", 1) > 1 and len(streams) > 1:
+            self._prefetch_schemas(streams)
+
         return streams
 
+    def _prefetch_schemas(self, streams: List[TursoStream]) -> None:
+        """Discover stream schemas in parallel worker threads.
+
+        Each worker uses a pooled read connection, so the schema lookups of all
+        tables overlap instead of running one after another. Failures are
+        left for the regular (lazy) discovery to report.
+
+        Args:
+            streams: Streams whose schemas should be discovered
+        """
+
+        def discover(stream: TursoStream) -> None:
+            try:
+                _ = stream.schema
+            except Exception as e:
+                self.logger.debug(f"Schema prefetch failed for {stream.name}: {e}")
+            finally:
+                self._release_thread_connection()
+
+        with ThreadPoolExecutor(
+            max_workers=self.config["concurrent_streams"],
+            thread_name_prefix="tap-turso-discovery",
+        ) as executor:
+            list(executor.map(discover, streams))
+
     def _validate_config(self, raise_errors: bool = True) -> None:
         """Validate tap configuration."""
         super()._validate_config(raise_errors=raise_errors)
@@ -149,3 +246,400 @@ class TapTurso(Tap):
                         f"Table '{table_config['name']}' has replication_method='INCREMENTAL' "
                         "but no 'replication_key' is specified"
                     )
+
+    @staticmethod
+    def _backoff(attempt: int, initial_delay: float, max_delay: float = 60.0) -> float:
+        """Return the delay before the next retry.
+
+        Exponential backoff with random jitter, so parallel taps retrying
+        against the same database don't retry in lockstep.
+
+        Args:
+            attempt: Zero-based number of the attempt that just failed
+            initial_delay: Delay in seconds for the first retry
+            max_delay: Upper bound for the delay in seconds
+
+        Returns:
+            Delay in seconds
+        """
+        delay = initial_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+        return min(delay, max_delay)
+
+    def _connect_with_retry(self, connect_func, max_retries: int = 3, initial_delay: float = 1.0):
+        """Execute connection function with exponential backoff retry logic.
+
+        Args:
+            connect_func: Function that returns a connection object
+            max_retries: Maximum number of retry attempts
+            initial_delay: Initial delay in seconds before first retry
+
+        Returns:
+            Connection object from connect_func
+
+        Raises:
+            Exception: If connection fails after all retries
+        """
+        last_error = None
+        for attempt in range(max_retries):
+            try:
+                start_time = time.time()
+                self.logger.info(f"Connecting to database (attempt {attempt + 1}/{max_retries})...")
+                self.logger.info("This may take a while for large databases - syncing from remote...")
+                connection = connect_func()
+                elapsed = time.time() - start_time
+                self.logger.info(f"Connection established successfully in {elapsed:.2f} seconds")
+                return connection
+            except Exception as error:
+                elapsed = time.time() - start_time
+                last_error = error
+                if attempt < max_retries - 1:
+                    delay = self._backoff(attempt, initial_delay)
+                    self.logger.warning(
+                        f"Connection attempt {attempt + 1} failed after {elapsed:.2f}s: {error}. "
+                        f"Retrying in {delay:.2f} seconds..."
+                    )
+                    time.sleep(delay)
+                else:
+                    # Last attempt failed
+                    self.logger.error(f"Connection failed after {max_retries} attempts and {elapsed:.2f}s: {error}")
+
+        raise last_error
+
+    def _sync_with_retry(self, connection, max_retries: int = 3, initial_delay: float = 1.0):
+        """Sync database with remote using exponential backoff retry logic.
+
+        Args:
+            connection: libsql connection object
+            max_retries: Maximum number of retry attempts
+            initial_delay: Initial delay in seconds before first retry
+
+        Raises:
+            Exception: If sync fails after all retries
+        """
+        for attempt in range(max_retries):
+            try:
+                start_time = time.time()
+                self.logger.info(f"Syncing with remote database (attempt {attempt + 1}/{max_retries})...")
+                self.logger.info("Downloading database changes from Turso...")
+                connection.sync()
+                elapsed = time.time() - start_time
+                self.logger.info(f"Sync completed successfully in {elapsed:.2f} seconds")
+                return
+            except Exception as sync_error:
+                elapsed = time.time() - start_time
+                if attempt < max_retries - 1:
+                    delay = self._backoff(attempt, initial_delay)
+                    self.logger.warning(
+                        f"Sync attempt {attempt + 1} failed after {elapsed:.2f}s: {sync_error}. "
+                        f"Retrying in {delay:.2f} seconds..."
+                    )
+                    time.sleep(delay)
+                else:
+                    # Last attempt failed
+                    self.logger.error(f"Sync failed after {max_retries} attempts and {elapsed:.2f}s: {sync_error}")
+                    raise
+
+    def get_connection(self):
+        """Get or create the database connection for the calling thread.
+
+        The main thread uses the connection shared by all streams, so the
+        connection (and for remote setups, the initial replica sync) is opened
+        once per tap run. Worker threads get their own connection, see
+        `_get_thread_connection`. All connections are closed by `sync_all` or
+        at exit.
+
+        Returns:
+            libsql connection object
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return self._get_thread_connection()
+
+        return self._get_shared_connection()
+
+    def _get_thread_connection(self):
+        """Get the read connection bound to the calling worker thread.
+
+        A worker takes an idle connection from the read pool (or opens a new
+        one) and keeps it until `_release_thread_connection` hands it back, so
+        connections are reused across streams and threads.
+
+        Returns:
+            libsql connection object
+        """
+        connection = getattr(self._thread_local, "connection", None)
+        if connection is not None:
+            return connection
+
+        try:
+            connection = self._read_pool.get_nowait()
+        except queue.Empty:
+            connection = self._open_read_connection()
+
+        self._thread_local.connection = connection
+        return connection
+
+    def _release_thread_connection(self) -> None:
+        """Return the calling thread's read connection to the pool."""
+        connection = getattr(self._thread_local, "connection", None)
+        if connection is not None:
+            self._thread_local.connection = None
+            self._read_pool.put(connection)
+
+    def _open_read_connection(self):
+        """Open a read connection for a worker thread.
+
+        Remote-only setups connect to the server directly. Otherwise workers
+        read the local database file: for embedded replicas the shared
+        connection is opened first, so the replica is synced exactly once
+        and workers read the synced file.
+
+        Returns:
+            libsql connection object
+        """
+        self._get_shared_connection()
+        if self.config.get("database_url") and not self.config.get("sync_url"):
+            connection = self._connect_with_retry(self._connect_remote)
+        else:
+            connection = libsql.connect(database=self.config.get("local_path", "local.db"))
+            self._apply_connection_pragmas(connection)
+            # Workers only ever read; writes go through the shared connection
+            connection.execute("PRAGMA query_only=1")
+
+        with self._connection_lock:
+            self._read_connections.append(connection)
+
+        return connection
+
+    def _get_shared_connection(self):
+        """Get or create the connection shared by all streams.
+
+        Returns:
+            libsql connection object
+        """
+        with self._connection_lock:
+            if self._shared_connection is None:
+                self._shared_connection = self._open_connection()
+
+                if not self._close_registered:
+                    atexit.register(self.close)
+                    self._close_registered = True
+
+        return self._shared_connection
+
+    def _connect_remote(self):
+        """Open a direct connection to the remote database without a local replica.
+
+        Returns:
+            libsql connection object
+        """
+        return libsql.connect(
+            database=self.config["database_url"],
+            auth_token=self.config["auth_token"],
+        )
+
+    def _open_connection(self):
+        """Open a new connection based on the configured connection mode.
+
+        Returns:
+            libsql connection object
+        """
+        config = self.config
+
+        try:
+            # Remote connection with embedded replica
+            if config.get("sync_url"):
+                self.logger.info(
+                    f"Connecting to Turso with embedded replica: {config.get('local_path', 'local.db')}"
+                )
+
+                # Use retry logic for connection (which includes initial sync)
+                def connect_embedded_replica():
+                    return libsql.connect(
+                        database=config.get("local_path", "local.db"),
+                        sync_url=config["sync_url"],
+                        auth_token=config.get("auth_token"),
+                    )
+
+                try:
+                    connection = self._connect_with_retry(connect_embedded_replica)
+                except Exception as conn_error:
+                    self.logger.warning(f"Failed to connect with sync: {conn_error}. Trying local-only mode.")
+                    # Fallback: try connecting without sync
+                    connection = libsql.connect(database=config.get("local_path", "local.db"))
+
+            # Remote connection only
+            elif config.get("database_url"):
+                self.logger.info(f"Connecting to remote Turso database")
+                # Queries go straight to the server; nothing is synced locally
+                # and the local storage PRAGMAs do not apply
+                return self._connect_with_retry(self._connect_remote)
+
+            # Local database only
+            else:
+                self.logger.info(
+                    f"Connecting to local database: {config['local_path']}"
+                )
+                connection = libsql.connect(database=config["local_path"])
+
+        except Exception as e:
+            self.logger.error(f"Failed to connect to database: {e}")
+            raise RuntimeError(f"Database connection failed: {e}")
+
+        self._apply_connection_pragmas(connection)
+
+        return connection
+
+    def close(self) -> None:
+        """Close all connections.
+
+        Called automatically at the end of `sync_all` and at interpreter exit.
+        Safe to call more than once; a later `get_connection` reconnects.
+        """
+        if self._close_registered:
+            atexit.unregister(self.close)
+            self._close_registered = False
+
+        with self._connection_lock:
+            read_connections, self._read_connections = self._read_connections, []
+            self._read_pool = queue.SimpleQueue()
+            self._thread_local = threading.local()
+        for connection in read_connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        if self._shared_connection is not None:
+            try:
+                self._shared_connection.close()
+            except Exception:
+                pass
+            self._shared_connection = None
+
+    def __enter__(self) -> "TapTurso":
+        """Return the tap for use as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the tap's connections when leaving the context."""
+        self.close()
+
+    def sync_all(self) -> None:
+        """Sync all streams, closing the database connections afterwards."""
+        try:
+            if self.config.get("concurrent_streams", 1) > 1:
+                self._sync_all_concurrently()
+            else:
+                super().sync_all()
+        finally:
+            self.close()
+
+    def _sync_all_concurrently(self) -> None:
+        """Sync selected streams in parallel worker threads.
+
+        Mirrors `Tap.sync_all`, but each stream syncs in a thread pool with its
+        own pooled read connection, so the streams' queries overlap.
+
+        All streams share the tap-wide state dict, which STATE messages
+        serialize. One lock therefore covers both message writes (so output
+        lines never interleave) and every stream method that changes state
+        (`_STATE_METHODS`), so a STATE message never sees a half-updated dict.
+
+        This depends on Singer SDK internals: the private `Tap` helpers used
+        below, `message_writer.write_message` and the names in
+        `_STATE_METHODS`. Check them when upgrading singer-sdk.
+        """
+        self._reset_state_progress_markers()
+        self._set_compatible_replication_methods()
+        if self.state:
+            self._state_writer.write_state(self.state)
+
+        streams = []
+        for stream in self.streams.values():
+            if not stream.selected and not stream.has_selected_descendents:
+                self.logger.info("Skipping deselected stream '%s'.", stream.name)
+                continue
+            if stream.parent_stream_type:
+                continue
+            streams.append(stream)
+
+        # Open (and sync) the shared connection before any worker needs it
+        self._get_shared_connection()
+
+        # Create every stream's state entry up front, so workers only change
+        # their own stream's dict and never add keys to the shared bookmarks
+        for stream in streams:
+            stream.get_context_state(None)
+
+        # Reentrant: finalizing state also writes a STATE message
+        lock = threading.RLock()
+
+        def locked(method):
+            def wrapper(*args, **kwargs):
+                with lock:
+                    return method(*args, **kwargs)
+
+            return wrapper
+
+        message_writer = self.message_writer
+        message_writer.write_message = locked(message_writer.write_message)
+        for stream in streams:
+            for name in self._STATE_METHODS:
+                setattr(stream, name, locked(getattr(stream, name)))
+
+        def sync_stream(stream: Stream) -> None:
+            try:
+                stream.sync()
+                stream.finalize_state_progress_markers()
+            finally:
+                self._release_thread_connection()
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.config["concurrent_streams"],
+                thread_name_prefix="tap-turso",
+            ) as executor:
+                futures = [executor.submit(sync_stream, stream) for stream in streams]
+                for future in futures:
+                    future.result()
+        finally:
+            del message_writer.write_message
+            for stream in streams:
+                for name in self._STATE_METHODS:
+                    delattr(stream, name)
+
+        for stream in self.streams.values():
+            stream.log_sync_costs()
+
+    def _apply_connection_pragmas(self, connection) -> None:
+        """Tune a freshly opened connection for large sequential reads.
+
+        A larger page cache keeps hot B-tree pages in memory during table
+        scans and memory-mapped I/O reduces read syscalls. The busy timeout
+        makes reads wait for a concurrent writer instead of failing with
+        SQLITE_BUSY. PRAGMAs are applied only when a connection is opened,
+        never when it is reused, and are sent together in one script.
+
+        Args:
+            connection: libsql connection object
+        """
+        cache_kb = int(self.config.get("sqlite_cache_kb", DEFAULT_SQLITE_CACHE_KB))
+        pragmas = (
+            # Negative cache_size is expressed in KiB rather than pages
+            f"PRAGMA cache_size=-{cache_kb}",
+            "PRAGMA mmap_size=268435456",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA busy_timeout=10000",
+        )
+        try:
+            connection.executescript(";\n".join(pragmas))
+            return
+        except Exception:
+            # Fall back to one statement at a time to find the failing PRAGMA
+            pass
+        for pragma in pragmas:
+            try:
+                connection.execute(pragma)
+            except Exception as e:
+                self.logger.warning(f"Could not apply '{pragma}': {e}")
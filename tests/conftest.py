@@ -1,10 +1,46 @@
 """Pytest configuration and fixtures for tap-turso tests."""
 
+from functools import lru_cache
+from types import MappingProxyType
+import copy
+import json
 import pytest
 import sqlite3
-import tempfile
-import os
-from pathlib import Path
+
+from tap_turso.streams import TursoStream
+from tap_turso.tap import TapTurso
+
+
+# Sample rows, in table column order
+USERS_ROWS = (
+    (1, "Alice", "alice@example.com", "2025-01-01 10:00:00", "2025-01-01 10:00:00"),
+    (2, "Bob", "bob@example.com", "2025-01-02 11:00:00", "2025-01-02 11:00:00"),
+    (3, "Charlie", "charlie@example.com", "2025-01-03 12:00:00", "2025-01-03 12:00:00"),
+)
+ORDERS_ROWS = (
+    (101, 1, 99.99, "completed", "2025-01-01 15:00:00"),
+    (102, 2, 149.50, "pending", "2025-01-02 16:00:00"),
+    (103, 1, 75.00, "completed", "2025-01-03 17:00:00"),
+)
+TEST_TYPES_ROWS = ((1, "test", 42, 3.14, b"Hello", 1, "2025-01-01 10:00:00"),)
+
+# Configuration shared by every test database; read-only, copied per use
+_BASE_CONFIG = MappingProxyType(
+    {
+        "tables": [
+            {
+                "name": "users",
+                "replication_method": "INCREMENTAL",
+                "replication_key": "updated_at",
+            },
+            {
+                "name": "orders",
+                "replication_method": "FULL_TABLE",
+            },
+        ],
+        "batch_size": 100,
+    }
+)
 
 
 @pytest.fixture
@@ -48,112 +84,176 @@ def mock_local_config(tmp_path):
     }
 
 
-@pytest.fixture
-def test_database(tmp_path):
-    """Create a test SQLite database with sample data."""
-    db_path = tmp_path / "test.db"
+@pytest.fixture(scope="session")
+def seed_database():
+    """Build the sample database once per session, in memory.
 
-    # Create connection
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
+    Under pytest-xdist every worker is its own process and session, so each
+    worker builds a private copy and nothing is shared across workers.
+    """
+    conn = sqlite3.connect(":memory:")
 
-    # Create users table
-    cursor.execute(
+    # One transaction for all DDL and DML
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                email TEXT,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP
+            )
         """
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            email TEXT,
-            created_at TIMESTAMP,
-            updated_at TIMESTAMP
         )
-    """
-    )
+        conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)", USERS_ROWS)
 
-    # Insert sample data
-    cursor.execute(
+        conn.execute(
+            """
+            CREATE TABLE orders (
+                order_id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                total REAL,
+                status TEXT,
+                created_at TIMESTAMP
+            )
         """
-        INSERT INTO users (id, name, email, created_at, updated_at)
-        VALUES
-            (1, 'Alice', 'alice@example.com', '2025-01-01 10:00:00', '2025-01-01 10:00:00'),
-            (2, 'Bob', 'bob@example.com', '2025-01-02 11:00:00', '2025-01-02 11:00:00'),
-            (3, 'Charlie', 'charlie@example.com', '2025-01-03 12:00:00', '2025-01-03 12:00:00')
-    """
-    )
+        )
+        conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?)", ORDERS_ROWS)
 
-    # Create orders table
-    cursor.execute(
+        # Table with various data types
+        conn.execute(
+            """
+            CREATE TABLE test_types (
+                id INTEGER PRIMARY KEY,
+                text_col TEXT,
+                int_col INTEGER,
+                real_col REAL,
+                blob_col BLOB,
+                bool_col BOOLEAN,
+                datetime_col DATETIME
+            )
         """
-        CREATE TABLE orders (
-            order_id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            total REAL,
-            status TEXT,
-            created_at TIMESTAMP
         )
-    """
-    )
+        conn.executemany("INSERT INTO test_types VALUES (?, ?, ?, ?, ?, ?, ?)", TEST_TYPES_ROWS)
 
-    cursor.execute(
-        """
-        INSERT INTO orders (order_id, user_id, total, status, created_at)
-        VALUES
-            (101, 1, 99.99, 'completed', '2025-01-01 15:00:00'),
-            (102, 2, 149.50, 'pending', '2025-01-02 16:00:00'),
-            (103, 1, 75.00, 'completed', '2025-01-03 17:00:00')
-    """
-    )
+    # Kept open for the session: an in-memory database lives as long as its connection
+    yield conn
+    conn.close()
 
-    # Create table with various data types
-    cursor.execute(
-        """
-        CREATE TABLE test_types (
-            id INTEGER PRIMARY KEY,
-            text_col TEXT,
-            int_col INTEGER,
-            real_col REAL,
-            blob_col BLOB,
-            bool_col BOOLEAN,
-            datetime_col DATETIME
-        )
-    """
-    )
 
-    cursor.execute(
-        """
-        INSERT INTO test_types (id, text_col, int_col, real_col, blob_col, bool_col, datetime_col)
-        VALUES (1, 'test', 42, 3.14, X'48656c6c6f', 1, '2025-01-01 10:00:00')
+@pytest.fixture
+def test_database(seed_database, tmp_path):
+    """Create a test SQLite database with sample data.
+
+    Each test gets its own file, copied from the in-memory seed, so tests
+    that change the schema or add indexes stay isolated. libsql cannot open
+    an in-memory database created by the sqlite3 module, so tests read files.
     """
-    )
+    db_path = tmp_path / "test.db"
+
+    conn = sqlite3.connect(str(db_path))
+    seed_database.backup(conn)
+    conn.close()
+
+    return db_path
+
+
+@pytest.fixture(scope="session")
+def shared_database(seed_database, tmp_path_factory):
+    """Create the sample database shared by tests that only read from it."""
+    db_path = tmp_path_factory.mktemp("shared") / "test.db"
 
-    conn.commit()
+    conn = sqlite3.connect(str(db_path))
+    seed_database.backup(conn)
     conn.close()
 
     return db_path
 
 
+def _database_config(db_path):
+    """Return a fresh copy of the standard test configuration for db_path."""
+    config = copy.deepcopy(dict(_BASE_CONFIG))
+    config["local_path"] = str(db_path)
+    config["schema_cache_dir"] = str(db_path.parent / "schema-cache")
+    return config
+
+
 @pytest.fixture
-def test_database_config(test_database):
-    """Return configuration for test database."""
-    return {
-        "local_path": str(test_database),
-        "tables": [
-            {
-                "name": "users",
-                "replication_method": "INCREMENTAL",
-                "replication_key": "updated_at",
-            },
-            {
-                "name": "orders",
-                "replication_method": "FULL_TABLE",
-            },
-        ],
-        "batch_size": 100,
-    }
+def test_database_config(shared_database):
+    """Return configuration for the shared test database.
+
+    The dict is new for every test and may be changed freely, but the
+    database itself must not be: use writable_database_config for that.
+    """
+    return _database_config(shared_database)
+
+
+@pytest.fixture
+def writable_database_config(test_database):
+    """Return configuration for a private copy of the test database."""
+    return _database_config(test_database)
+
+
+@lru_cache(maxsize=None)
+def _cached_tap(frozen_config):
+    """Return one tap per distinct configuration, built from its JSON form."""
+    return TapTurso(config=json.loads(frozen_config))
+
+
+@pytest.fixture(scope="session")
+def cached_tap(shared_database):
+    """Return a tap over the shared database.
+
+    The tap and its discovered schemas are reused across tests, so tests
+    using it must not modify the tap, its streams or the database.
+    """
+    return _cached_tap(json.dumps(_database_config(shared_database), sort_keys=True))
+
+
+@pytest.fixture
+def make_stream(cached_tap):
+    """Return a factory building TursoStream objects on the cached tap."""
+
+    def _make(**kwargs):
+        return TursoStream(tap=cached_tap, **kwargs)
+
+    return _make
+
+
+@pytest.fixture(scope="module")
+def users_stream(cached_tap):
+    """Return an incremental users stream on the cached tap."""
+    return TursoStream(
+        tap=cached_tap,
+        name="users",
+        table_name="users",
+        replication_method="INCREMENTAL",
+        replication_key="updated_at",
+    )
+
+
+@pytest.fixture(scope="module")
+def users_incremental_records(users_stream):
+    """Return the users stream and the records it extracts without state."""
+    return users_stream, list(users_stream.get_records(context=None))
+
+
+@pytest.fixture(scope="module")
+def test_database_config_with_types(shared_database):
+    """Return read-only configuration for the shared database including test_types.
+
+    The config is shared by the module and keys the cached tap, so it is
+    frozen: the mapping and each table are read-only and tables is a tuple.
+    """
+    config = _database_config(shared_database)
+    tables = [*config["tables"], {"name": "test_types", "replication_method": "FULL_TABLE"}]
+    config["tables"] = tuple(MappingProxyType(table) for table in tables)
+    return MappingProxyType(config)
 
 
-@pytest.fixture(autouse=True)
-def reset_connection_cache():
-    """Reset connection cache between tests."""
-    yield
-    # Cleanup happens automatically with stream destruction
+@pytest.fixture(scope="module")
+def types_stream(test_database_config_with_types):
+    """Return the test_types stream of a cached tap over the shared database."""
+    frozen_config = json.dumps(test_database_config_with_types, sort_keys=True, default=dict)
+    return _cached_tap(frozen_config).streams["test_types"]
@@ -1,16 +1,38 @@
 """Test tap-turso Stream class."""
 
+import json
+import os
+import sqlite3
+from types import SimpleNamespace
+
 import pytest
 from tap_turso.tap import TapTurso
+from tap_turso import streams as streams_module
 from tap_turso.streams import TursoStream
-from singer_sdk import typing as th
 
 
-def test_stream_schema_discovery(test_database_config):
+class _CursorSpy:
+    """Wrap a libsql cursor and count fetchmany() calls."""
+
+    def __init__(self, cursor):
+        self.__dict__["_cursor"] = cursor
+        self.__dict__["fetchmany_calls"] = 0
+
+    def fetchmany(self, *args):
+        self.__dict__["fetchmany_calls"] += 1
+        return self._cursor.fetchmany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # Forward arraysize so fetchmany() pages by the stream's batch size
+        setattr(self._cursor, name, value)
+
+
+def test_stream_schema_discovery(make_stream):
     """Test schema discovery from database table."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
+    stream = make_stream(
         name="users",
         table_name="users",
         replication_method="INCREMENTAL",
@@ -23,19 +45,14 @@ def test_stream_schema_discovery(test_database_config):
     assert "properties" in schema
 
     # Check expected columns
-    assert "id" in schema["properties"]
-    assert "name" in schema["properties"]
-    assert "email" in schema["properties"]
-    assert "created_at" in schema["properties"]
-    assert "updated_at" in schema["properties"]
-    assert "_sdc_extracted_at" in schema["properties"]
+    expected = {"id", "name", "email", "created_at", "updated_at", "_sdc_extracted_at"}
+    missing = expected - schema["properties"].keys()
+    assert not missing, f"missing: {missing}"
 
 
-def test_primary_key_detection(test_database_config):
+def test_primary_key_detection(make_stream):
     """Test automatic primary key detection."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
+    stream = make_stream(
         name="users",
         table_name="users",
         replication_method="FULL_TABLE",
@@ -47,11 +64,9 @@ def test_primary_key_detection(test_database_config):
     assert "id" in primary_keys
 
 
-def test_primary_key_from_config(test_database_config):
+def test_primary_key_from_config(make_stream):
     """Test primary key from configuration."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
+    stream = make_stream(
         name="users",
         table_name="users",
         replication_method="FULL_TABLE",
@@ -61,11 +76,9 @@ def test_primary_key_from_config(test_database_config):
     assert stream.primary_keys == ["email"]
 
 
-def test_full_table_replication(test_database_config):
+def test_full_table_replication(make_stream):
     """Test full table extraction."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
+    stream = make_stream(
         name="orders",
         table_name="orders",
         replication_method="FULL_TABLE",
@@ -83,19 +96,10 @@ def test_full_table_replication(test_database_config):
     assert "_sdc_extracted_at" in records[0]
 
 
-def test_incremental_replication(test_database_config):
+def test_incremental_replication(users_incremental_records):
     """Test incremental extraction with replication key."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
-        name="users",
-        table_name="users",
-        replication_method="INCREMENTAL",
-        replication_key="updated_at",
-    )
-
     # First sync - get all records
-    records = list(stream.get_records(context=None))
+    _, records = users_incremental_records
     assert len(records) == 3
 
     # Records should be sorted by updated_at
@@ -104,73 +108,56 @@ def test_incremental_replication(test_database_config):
     assert records[2]["id"] == 3  # 2025-01-03
 
 
-def test_incremental_with_state(test_database_config):
-    """Test incremental query building."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
-        name="users",
-        table_name="users",
-        replication_method="INCREMENTAL",
-        replication_key="updated_at",
-    )
+def test_incremental_with_state(test_database_config, capsys):
+    """Test that incremental extraction resumes after the bookmarked value."""
+    state = {
+        "bookmarks": {
+            "users": {
+                "replication_key": "updated_at",
+                "replication_key_value": "2025-01-02 00:00:00",
+            }
+        }
+    }
+    tap = TapTurso(config=test_database_config, state=state)
 
-    # Test without state - should get all records
-    records = list(stream.get_records(context=None))
-    assert len(records) == 3
+    # The SDK turns the bookmark into a starting value as part of a sync
+    tap.sync_all()
 
-    # Records should be sorted by updated_at
-    assert records[0]["id"] == 1
-    assert records[1]["id"] == 2
-    assert records[2]["id"] == 3
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [
+        m["record"] for m in messages if m["type"] == "RECORD" and m["stream"] == "users"
+    ]
+    # Only rows updated after the bookmark, still sorted by updated_at
+    assert len(records) == 2
+    assert [record["id"] for record in records] == [2, 3]
 
 
-def test_type_mapping(test_database_config):
+def test_type_mapping(types_stream):
     """Test SQLite to Singer type mapping."""
-    tap = TapTurso(config=test_database_config)
-
-    # Add test_types table to config
-    test_config = test_database_config.copy()
-    test_config["tables"].append({"name": "test_types", "replication_method": "FULL_TABLE"})
-
-    tap = TapTurso(config=test_config)
-    stream = TursoStream(
-        tap=tap,
-        name="test_types",
-        table_name="test_types",
-        replication_method="FULL_TABLE",
-    )
-
-    schema = stream.schema
+    schema = types_stream.schema
     props = schema["properties"]
 
     # Check type mappings (all should be nullable except primary key)
-    assert "integer" in props["id"]["type"]  # INTEGER -> integer
-    assert "string" in props["text_col"]["type"]  # TEXT -> string
-    assert "integer" in props["int_col"]["type"]  # INTEGER -> integer
-    assert "number" in props["real_col"]["type"]  # REAL -> number
-    assert "string" in props["blob_col"]["type"]  # BLOB -> string (base64)
-    assert "boolean" in props["bool_col"]["type"]  # BOOLEAN -> boolean
-    assert "string" in props["datetime_col"]["type"]  # DATETIME -> datetime
-
-
-def test_record_extraction_with_types(test_database_config):
+    expected_types = {
+        "id": "integer",  # INTEGER -> integer
+        "text_col": "string",  # TEXT -> string
+        "int_col": "integer",  # INTEGER -> integer
+        "real_col": "number",  # REAL -> number
+        "blob_col": "string",  # BLOB -> string (base64)
+        "bool_col": "boolean",  # BOOLEAN -> boolean
+        "datetime_col": "string",  # DATETIME -> datetime
+    }
+    mismatched = {
+        col: props[col]["type"]
+        for col, json_type in expected_types.items()
+        if json_type not in props[col]["type"]
+    }
+    assert not mismatched, f"unexpected types: {mismatched}"
+
+
+def test_record_extraction_with_types(types_stream):
     """Test that records are properly extracted with correct types."""
-    tap = TapTurso(config=test_database_config)
-
-    # Add test_types table to config
-    test_config = test_database_config.copy()
-    test_config["tables"].append({"name": "test_types", "replication_method": "FULL_TABLE"})
-
-    tap = TapTurso(config=test_config)
-    stream = TursoStream(
-        tap=tap,
-        name="test_types",
-        table_name="test_types",
-        replication_method="FULL_TABLE",
-    )
-
-    records = list(stream.get_records(context=None))
+    records = list(types_stream.get_records(context=None))
 
     assert len(records) == 1
     record = records[0]
@@ -183,9 +170,10 @@ def test_record_extraction_with_types(test_database_config):
     assert record["bool_col"] == 1  # SQLite stores booleans as 0/1
     # BLOB is base64 encoded
     assert isinstance(record["blob_col"], str)
+    assert record["blob_col"] == "SGVsbG8="  # b"Hello"
 
 
-def test_batch_fetching(test_database_config):
+def test_batch_fetching(test_database_config, monkeypatch):
     """Test batch fetching with small batch size."""
     # Modify config to use small batch size
     config = test_database_config.copy()
@@ -198,18 +186,29 @@ def test_batch_fetching(test_database_config):
         table_name="users",
         replication_method="FULL_TABLE",
     )
+    _ = stream.schema
+
+    conn = stream._get_connection()
+    cursors = []
+
+    def execute(*args):
+        cursors.append(_CursorSpy(conn.execute(*args)))
+        return cursors[-1]
+
+    monkeypatch.setattr(stream, "_get_connection", lambda: SimpleNamespace(execute=execute))
 
     records = list(stream.get_records(context=None))
 
     # Should still get all records despite small batch size
     assert len(records) == 3
+    # With the default config, one page per record plus the empty page that
+    # ends the loop: batch_size is honoured from the very first fetch
+    assert cursors[0].fetchmany_calls == 4
 
 
-def test_nonexistent_table(test_database_config):
+def test_nonexistent_table(make_stream):
     """Test error handling for nonexistent table."""
-    tap = TapTurso(config=test_database_config)
-    stream = TursoStream(
-        tap=tap,
+    stream = make_stream(
         name="nonexistent",
         table_name="nonexistent",
         replication_method="FULL_TABLE",
@@ -220,9 +219,73 @@ def test_nonexistent_table(test_database_config):
         _ = stream.schema
 
 
-def test_connection_reuse(test_database_config):
+def test_connection_reuse(users_stream):
     """Test that database connection is reused."""
+    assert users_stream._get_connection() is users_stream._get_connection()
+
+
+def test_schema_cache_persisted(test_database, writable_database_config):
+    """Test that discovered schemas are persisted and invalidated on schema change."""
+    tap = TapTurso(config=writable_database_config)
+    stream = TursoStream(
+        tap=tap,
+        name="orders",
+        table_name="orders",
+        replication_method="FULL_TABLE",
+    )
+    _ = stream.schema
+
+    cache_path = stream._schema_cache_path()
+    assert os.path.exists(cache_path)
+    with open(cache_path) as cache_file:
+        entry = json.load(cache_file)
+    assert entry["primary_keys"] == ["order_id"]
+    assert "total" in entry["schema"]["properties"]
+
+    # Changing the table bumps PRAGMA schema_version and invalidates the entry
+    conn = sqlite3.connect(str(test_database))
+    conn.execute("ALTER TABLE orders ADD COLUMN notes TEXT")
+    conn.commit()
+    conn.close()
+
+    tap._shared_connection = None
+    fresh_stream = TursoStream(
+        tap=tap,
+        name="orders",
+        table_name="orders",
+        replication_method="FULL_TABLE",
+    )
+    assert "notes" in fresh_stream.schema["properties"]
+
+
+def test_incremental_query_binds_start_value(test_database_config, monkeypatch):
+    """Test that the incremental start value is passed as a bind parameter."""
     tap = TapTurso(config=test_database_config)
+    stream = TursoStream(
+        tap=tap,
+        name="users",
+        table_name="users",
+        replication_method="INCREMENTAL",
+        replication_key="updated_at",
+    )
+    start_value = "2025-01-02 00:00:00' OR '1'='1"
+    monkeypatch.setattr(
+        stream, "get_starting_replication_key_value", lambda context: start_value
+    )
+
+    query, params = stream._build_incremental_query(context=None)
+
+    assert start_value not in query
+    assert params[-1] == start_value
+
+
+def test_connection_pragmas_applied(test_database_config):
+    """Test that read tuning PRAGMAs are applied to new connections."""
+    config = test_database_config.copy()
+    config["sqlite_cache_kb"] = 1234
+
+    tap = TapTurso(config=config)
+    tap._shared_connection = None
     stream = TursoStream(
         tap=tap,
         name="users",
@@ -230,9 +293,195 @@ def test_connection_reuse(test_database_config):
         replication_method="FULL_TABLE",
     )
 
-    # Get connection twice
-    conn1 = stream._get_connection()
-    conn2 = stream._get_connection()
+    conn = stream._get_connection()
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -1234
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 10000
+
+
+def test_replication_key_index_created(test_database, writable_database_config):
+    """Test that the replication key index is created when enabled."""
+    config = writable_database_config.copy()
+    config["create_replication_key_index"] = True
+
+    tap = TapTurso(config=config)
+    stream = TursoStream(
+        tap=tap,
+        name="users",
+        table_name="users",
+        replication_method="INCREMENTAL",
+        replication_key="updated_at",
+    )
+
+    records = list(stream.get_records(context=None))
+    assert len(records) == 3
+
+    conn = sqlite3.connect(str(test_database))
+    index_names = [row[1] for row in conn.execute('PRAGMA index_list("users")')]
+    conn.close()
+    assert "ix_tap_turso_users_updated_at" in index_names
+
+
+def test_replication_key_index_tracked_per_tap(test_database, writable_database_config):
+    """Test that a second tap ensures the index again instead of trusting another tap."""
+    config = {**writable_database_config, "create_replication_key_index": True}
+    list(TapTurso(config=config).streams["users"].get_records(context=None))
+
+    conn = sqlite3.connect(str(test_database))
+    conn.execute("DROP INDEX ix_tap_turso_users_updated_at")
+    conn.commit()
+
+    list(TapTurso(config=config).streams["users"].get_records(context=None))
+
+    index_names = [row[1] for row in conn.execute('PRAGMA index_list("users")')]
+    conn.close()
+    assert "ix_tap_turso_users_updated_at" in index_names
+
+
+def test_incremental_without_new_rows(test_database_config, monkeypatch):
+    """Test that incremental sync returns nothing when state is up to date."""
+    tap = TapTurso(config=test_database_config)
+    stream = TursoStream(
+        tap=tap,
+        name="users",
+        table_name="users",
+        replication_method="INCREMENTAL",
+        replication_key="updated_at",
+    )
+    monkeypatch.setattr(
+        stream, "get_starting_replication_key_value", lambda context: "2025-01-03 12:00:00"
+    )
+
+    assert list(stream.get_records(context=None)) == []
+
+
+def test_schema_cache_pruned(writable_database_config, monkeypatch):
+    """Test that the schema cache keeps only the most recently used entries."""
+    monkeypatch.setattr(streams_module, "SCHEMA_CACHE_MAX_ENTRIES", 1)
+    tap = TapTurso(config=writable_database_config)
+
+    for table in ("users", "orders"):
+        stream = TursoStream(tap=tap, name=table, table_name=table)
+        _ = stream.schema
+
+    cache_files = os.listdir(writable_database_config["schema_cache_dir"])
+    assert len(cache_files) == 1
+    assert cache_files[0].endswith("-orders.json")
+
+
+def test_deselected_columns_not_queried(test_database_config):
+    """Test that only columns selected in the catalog are read."""
+    tap = TapTurso(config=test_database_config)
+    stream = tap.streams["users"]
+    stream.metadata[("properties", "email")].selected = False
+    stream._mask = None
+
+    query, _ = stream._select_query()
+    records = list(stream.get_records(context=None))
+
+    assert '"email"' not in query and "*" not in query
+    assert "email" not in records[0]
+    assert records[0]["name"] == "Alice"
+
+
+@pytest.mark.parametrize("threshold", [0, 2, 3, 10])
+def test_in_memory_threshold(test_database_config, threshold):
+    """Test that all rows are returned whether or not the table fits in memory."""
+    config = {**test_database_config, "batch_size": 1, "in_memory_threshold": threshold}
+    tap = TapTurso(config=config)
+
+    records = list(tap.streams["users"].get_records(context=None))
+
+    assert [r["name"] for r in records] == ["Alice", "Bob", "Charlie"]
+
+
+def test_records_without_info_logging(test_database_config, monkeypatch):
+    """Test that records are still produced when per-batch logging is disabled."""
+    config = {**test_database_config, "batch_size": 1}
+    tap = TapTurso(config=config)
+    stream = tap.streams["users"]
+    monkeypatch.setattr(stream.logger, "isEnabledFor", lambda level: False)
+
+    records = list(stream.get_records(context=None))
+
+    assert stream._batch_size == 1
+    assert len(records) == 3
+
+
+def test_generated_columns_extracted(test_database, writable_database_config):
+    """Test that generated columns are discovered and records stay aligned."""
+    conn = sqlite3.connect(str(test_database))
+    conn.execute(
+        "CREATE TABLE generated (id INTEGER PRIMARY KEY, a INTEGER, "
+        "b INTEGER GENERATED ALWAYS AS (a * 2), note TEXT)"
+    )
+    conn.execute("INSERT INTO generated (id, a, note) VALUES (1, 5, 'hello')")
+    conn.commit()
+    conn.close()
+
+    tap = TapTurso(config=writable_database_config)
+    stream = TursoStream(tap=tap, name="generated", table_name="generated")
+
+    records = list(stream.get_records(context=None))
+
+    assert "b" in stream.schema["properties"]
+    assert {k: v for k, v in records[0].items() if k != "_sdc_extracted_at"} == {
+        "id": 1,
+        "a": 5,
+        "b": 10,
+        "note": "hello",
+    }
+
+
+def test_column_count_mismatch_raises(cached_tap, monkeypatch):
+    """Test that records are not emitted when result columns do not match the schema."""
+    stream = TursoStream(tap=cached_tap, name="orders", table_name="orders")
+    _ = stream.schema
+    monkeypatch.setattr(stream, "_column_names", stream._column_names[:-1])
+    monkeypatch.setattr(stream, "_column_converters", stream._column_converters[:-1])
+    monkeypatch.setattr(
+        stream,
+        "_select_query",
+        lambda: ('SELECT *, ? AS _sdc_extracted_at FROM "orders"', ("now",)),
+    )
+
+    with pytest.raises(RuntimeError, match="columns but .* were expected"):
+        list(stream.get_records(context=None))
+
+
+def test_bytes_in_non_blob_column_encoded(test_database, writable_database_config):
+    """Test that BLOB values stored in a TEXT column are still base64 encoded."""
+    conn = sqlite3.connect(str(test_database))
+    conn.execute("UPDATE users SET email = X'48656c6c6f' WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    tap = TapTurso(config=writable_database_config)
+
+    records = list(tap.streams["users"].get_records(context=None))
+
+    assert records[0]["email"] == "SGVsbG8="
+    assert records[1]["email"] == "bob@example.com"
+
+
+def test_schema_cache_ignored_for_replaced_database(test_database, writable_database_config):
+    """Test that a different database file with the same schema_version is rediscovered."""
+    tap = TapTurso(config=writable_database_config)
+    assert "total" in tap.streams["orders"].schema["properties"]
+    tap.close()
+
+    conn = sqlite3.connect(str(test_database))
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    conn.close()
+    os.remove(test_database)
+
+    # A fresh file with other orders columns but the same schema_version
+    conn = sqlite3.connect(str(test_database))
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, updated_at TIMESTAMP)")
+    conn.execute("CREATE TABLE orders (order_id INTEGER PRIMARY KEY, amount REAL)")
+    conn.commit()
+    conn.execute(f"PRAGMA schema_version = {schema_version}")
+    conn.close()
 
-    # Should be the same object
-    assert conn1 is conn2
+    properties = TapTurso(config=writable_database_config).streams["orders"].schema["properties"]
+    assert "amount" in properties
+    assert "total" not in properties
@@ -1,8 +1,20 @@
 """Test tap-turso Tap class."""
 
+import json
+import re
+import threading
+
+import libsql
 import pytest
 from tap_turso.tap import TapTurso
 
+# Expected configuration validation errors
+# Raised for any config that matches none of the connection modes, including
+# one that combines database_url with local_path
+_ERR_CONNECTION_MODE = re.compile("Must provide one of")
+_ERR_AUTH_TOKEN = re.compile("auth_token.*required")
+_ERR_REPLICATION_KEY = re.compile("replication_key.*specified")
+
 
 @pytest.mark.skip(reason="Requires actual Turso remote database connection")
 def test_tap_initialization_with_remote_config(mock_remote_config):
@@ -13,66 +25,59 @@ def test_tap_initialization_with_remote_config(mock_remote_config):
     assert len(tap.config["tables"]) == 2
 
 
-def test_tap_initialization_with_local_config(test_database_config):
+def test_tap_initialization_with_local_config(cached_tap):
     """Test tap initialization with valid local configuration."""
-    tap = TapTurso(config=test_database_config)
+    tap = cached_tap
     assert "local_path" in tap.config
     assert len(tap.config["tables"]) == 2
 
 
-def test_tap_missing_connection_config():
-    """Test that tap fails without database_url or local_path."""
-    config = {
-        "tables": [{"name": "users", "replication_method": "FULL_TABLE"}],
-    }
-
-    with pytest.raises(ValueError, match="Must provide either"):
-        tap = TapTurso(config=config)
-        tap._validate_config()
-
-
-def test_tap_both_connection_configs():
-    """Test that tap fails with both database_url and local_path."""
-    config = {
-        "database_url": "libsql://test.turso.io",
-        "local_path": "/tmp/test.db",
-        "auth_token": "token",
-        "tables": [{"name": "users"}],
-    }
-
-    with pytest.raises(ValueError, match="Cannot provide both"):
-        tap = TapTurso(config=config)
-        tap._validate_config()
-
-
-def test_tap_missing_auth_token():
-    """Test that tap fails when database_url is provided without auth_token."""
-    config = {
-        "database_url": "libsql://test.turso.io",
-        "tables": [{"name": "users"}],
-    }
-
-    with pytest.raises(ValueError, match="auth_token.*required"):
+@pytest.mark.parametrize(
+    "config,match",
+    [
+        pytest.param(
+            {"tables": [{"name": "users", "replication_method": "FULL_TABLE"}]},
+            _ERR_CONNECTION_MODE,
+            id="missing_connection_config",
+        ),
+        pytest.param(
+            {
+                "database_url": "libsql://test.turso.io",
+                "local_path": "/tmp/test.db",
+                "auth_token": "token",
+                "tables": [{"name": "users"}],
+            },
+            _ERR_CONNECTION_MODE,
+            id="both_connection_configs",
+        ),
+        pytest.param(
+            {
+                "database_url": "libsql://test.turso.io",
+                "tables": [{"name": "users"}],
+            },
+            _ERR_AUTH_TOKEN,
+            id="missing_auth_token",
+        ),
+        pytest.param(
+            {
+                "local_path": "/tmp/test.db",
+                "tables": [{"name": "users", "replication_method": "INCREMENTAL"}],
+            },
+            _ERR_REPLICATION_KEY,
+            id="incremental_without_replication_key",
+        ),
+    ],
+)
+def test_tap_invalid_config(config, match):
+    """Test that the tap rejects invalid connection and table configurations."""
+    with pytest.raises(ValueError, match=match):
         tap = TapTurso(config=config)
         tap._validate_config()
 
 
-def test_tap_incremental_without_replication_key():
-    """Test that tap fails when INCREMENTAL is set without replication_key."""
-    config = {
-        "local_path": "/tmp/test.db",
-        "tables": [{"name": "users", "replication_method": "INCREMENTAL"}],
-    }
-
-    with pytest.raises(ValueError, match="replication_key.*specified"):
-        tap = TapTurso(config=config)
-        tap._validate_config()
-
-
-def test_stream_discovery(test_database_config):
+def test_stream_discovery(cached_tap):
     """Test stream discovery from configuration."""
-    tap = TapTurso(config=test_database_config)
-    streams = tap.discover_streams()
+    streams = cached_tap.discover_streams()
 
     assert len(streams) == 2
 
@@ -96,3 +101,108 @@ def test_tap_with_custom_batch_size(test_database_config):
     test_database_config["batch_size"] = 500
     tap = TapTurso(config=test_database_config)
     assert tap.config["batch_size"] == 500
+
+
+def test_shared_connection_lifecycle(test_database_config):
+    """Test that streams share one tap connection which can be closed and reopened."""
+    tap = TapTurso(config=test_database_config)
+    streams = tap.discover_streams()
+
+    conn = tap.get_connection()
+    assert all(stream._get_connection() is conn for stream in streams)
+
+    tap.close()
+    assert tap._shared_connection is None
+    assert tap.get_connection() is not conn
+
+
+def test_concurrent_stream_sync(test_database_config, capsys):
+    """Test that streams synced in parallel emit all records."""
+    test_database_config["concurrent_streams"] = 2
+    tap = TapTurso(config=test_database_config)
+
+    tap.sync_all()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [m for m in messages if m["type"] == "RECORD"]
+    assert len([m for m in records if m["stream"] == "users"]) == 3
+    assert len([m for m in records if m["stream"] == "orders"]) == 3
+    assert tap._shared_connection is None
+
+    # The final STATE carries both streams' bookmarks
+    state = [m for m in messages if m["type"] == "STATE"][-1]["value"]
+    assert state["bookmarks"]["users"]["replication_key_value"] == "2025-01-03 12:00:00"
+    assert "orders" in state["bookmarks"]
+    # The locked state wrappers are removed again after the sync
+    assert not any(
+        name in vars(stream) for stream in tap.streams.values() for name in tap._STATE_METHODS
+    )
+
+
+def test_worker_read_connections_pooled(test_database_config):
+    """Test that worker threads reuse pooled read-only connections."""
+    tap = TapTurso(config=test_database_config)
+    seen = []
+
+    def worker():
+        conn = tap.get_connection()
+        seen.append((conn, conn.execute("PRAGMA query_only").fetchone()[0]))
+        tap._release_thread_connection()
+
+    for _ in range(2):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    (first, first_query_only), (second, _) = seen
+    assert first is second
+    assert first is not tap.get_connection()
+    assert first_query_only == 1
+
+
+def test_tap_context_manager_closes_connection(test_database_config):
+    """Test that leaving the tap context closes its connections."""
+    with TapTurso(config=test_database_config) as tap:
+        tap.get_connection()
+        assert tap._close_registered
+
+    assert tap._shared_connection is None
+    assert not tap._close_registered
+
+
+def test_concurrent_schema_prefetch(test_database_config):
+    """Test that schemas are discovered up front when streams run concurrently."""
+    test_database_config["concurrent_streams"] = 2
+    tap = TapTurso(config=test_database_config)
+
+    streams = tap.discover_streams()
+
+    assert all(stream._schema_cache is not None for stream in streams)
+
+
+def test_retry_backoff_has_jitter_and_cap():
+    """Test that retry delays are jittered around the exponential value and capped."""
+    delays = [TapTurso._backoff(2, 1.0) for _ in range(50)]
+    assert all(2.0 <= delay <= 6.0 for delay in delays)
+    assert len(set(delays)) > 1
+    assert TapTurso._backoff(20, 1.0) == 60.0
+
+
+def test_remote_only_connects_directly(mock_remote_config, shared_database, monkeypatch):
+    """Test that a remote-only config connects to the server without a local replica."""
+    calls = []
+    connect = libsql.connect
+
+    def fake_connect(**kwargs):
+        calls.append(kwargs)
+        return connect(database=str(shared_database))
+
+    monkeypatch.setattr("tap_turso.tap.libsql.connect", fake_connect)
+    mock_remote_config["schema_cache_dir"] = str(shared_database.parent / "schema-cache")
+    tap = TapTurso(config=mock_remote_config)
+
+    assert calls == [{
+        "database": "libsql://test-db.turso.io",
+        "auth_token": "test_auth_token_12345",
+    }]
+    tap.close()